@@ -1,10 +1,13 @@
 #!/usr/bin/env python
 from importlib import import_module
 import os
-from flask import Flask, render_template, Response, jsonify
+from flask import Flask, render_template, Response, jsonify, request
 import json
 import time
+import uuid
 from flask_cors import CORS
+from zones import ZoneEngine
+from recorder import Recorder
 
 
 
@@ -27,8 +30,24 @@ expression_server_url = f'http://{rpi_ip}:{expression_port}'
 main_server_url = f'http://{laptop_ip}:{main_server_port}'
 main_frontend_url = f'http://{laptop_ip}:{main_frontend_port}'
 
+LONG_POLL_TIMEOUT = 5  # seconds a request may wait for a newer frame
+# frame sequence numbers restart with the process, so ETags carry this too
+BOOT_ID = uuid.uuid4().hex[:8]
+
+camera = None  # shared camera used by the polling endpoints
+json_cache = (0, None)  # (sequence number, serialized detections)
+
+# zones evaluated in the camera thread, see zones.py
+zones = ZoneEngine.from_file(os.environ.get('ZONES_FILE', 'zones.json'))
+if zones.zones:
+    Camera.listeners.append(zones.update)
+
+# records frames and detections while started through /record/start
+recorder = Recorder.from_env()
+
 app = Flask(__name__)
-CORS(app, resources={r"/see": {"origins":[ expression_server_url]}})
+CORS(app, resources={r"/see": {"origins":[ expression_server_url],
+                               "expose_headers": ["ETag", "X-Frame-Timestamp"]}})
 
 
 
@@ -47,38 +66,78 @@ def gen(camera):
         print(f"\033[2J\033[1;1H{cameraDebug}\n{objects}", end="", flush=True,)
         yield b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n--frame\r\n'
 
-def jsonData(camera):
-    """Jsondata streaming generator function."""
-    debug = False
-    # yield b'--frame\r\n'
+def get_camera():
+    """Return a camera whose background thread is running.
+
+    The instance is shared between requests so that polling endpoints do not
+    construct a new camera (and reload its model) every time.
+    """
+    global camera
+    if camera is None or Camera.thread is None:
+        camera = Camera()
+    return camera
+
+
+def frame_etag(seq):
+    """ETag of a frame, unique across server restarts."""
+    return f'{BOOT_ID}-{seq}'
+
+
+def latest_frame(wait):
+    """Pick the frame to answer the current request with.
+
+    With `wait` the request blocks until the next frame, or, if the client
+    sent If-None-Match for an older frame, returns the current one right
+    away. Without `wait` the cached frame is returned immediately.
+    """
+    cam = get_camera()
+    seq, timestamp, frame = cam.get_latest()
+    if wait and (not request.if_none_match
+                 or request.if_none_match.contains(frame_etag(seq))):
+        seq, timestamp, frame = cam.get_newer(seq, LONG_POLL_TIMEOUT)
+    return seq, timestamp, frame
+
+
+def frame_response(seq, timestamp, body, mimetype):
+    """Build a response carrying the frame sequence number as its ETag, or a
+    304 if the client already has this frame."""
+    if request.if_none_match.contains(frame_etag(seq)):
+        response = Response(status=304)
+    else:
+        response = Response(body(), mimetype=mimetype)
+    response.set_etag(frame_etag(seq))
+    response.headers['X-Frame-Timestamp'] = f'{timestamp:.6f}'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def detections_json(seq, objects):
+    """Serialize the detections of a frame, once per frame."""
+    global json_cache
+    if json_cache[0] != seq:
+        json_cache = (seq, json.dumps(objects))
+    return json_cache[1]
+
+
+def zone_events(last_id):
+    """Server-sent events stream of zone enter/exit events."""
     while True:
-        testData  =[ {
-                        "id": "0",
-                        "label": "person",
-                        "status": "TRACKED",
-                        "roi": {
-                            "x1": "0",
-                            "y1": "0",
-                            "x2": "0",
-                            "y2": "0"
-                        },
-                        "spatialCoordinates": {
-                            "x": int("10"),
-                            "y": int("10"),
-                            "z": int("400")
-                        }
-                    }]
-        if(not debug):
-            frame, objects, cameraDebug= camera.get_frame()
-            json_data = objects
-            print(f"\033[2J\033[1;1H{cameraDebug}\n{objects}", end="", flush=True,)
-            send_data =json.dumps(json_data)
-            return send_data
-
-        if(debug):
-            return json.dump(testData)
-        
-        # return json.dumps(objects)
+        get_camera().get_latest()  # keep the camera running for this client
+        events = zones.events_since(last_id, LONG_POLL_TIMEOUT)
+        for event in events:
+            last_id = event['id']
+            yield f"id: {last_id}\ndata: {json.dumps(event)}\n\n"
+        if not events:
+            yield ": keepalive\n\n"
+
+
+def record_frame(seq, timestamp, frame):
+    """Camera listener feeding the recorder."""
+    if recorder.recording:
+        camera.get_latest()  # recording counts as a client, keep the camera running
+        recorder.update(seq, timestamp, frame)
+
+Camera.listeners.append(record_frame)
 
 
 @app.route('/video_feed')
@@ -89,8 +148,60 @@ def video_feed():
 
 @app.route("/see")
 def data():
-    """Json data streaming route. Use this data in other client side applications."""
-    return Response(jsonData(Camera()), mimetype='application/json')
+    """Json data route. Use this data in other client side applications.
+
+    Waits for the next frame by default; pass wait=0 to get the detections of
+    the most recent frame immediately.
+    """
+    wait = request.args.get('wait', default=1, type=int)
+    seq, timestamp, frame = latest_frame(wait)
+    return frame_response(seq, timestamp,
+                          lambda: detections_json(seq, frame[1]),
+                          'application/json')
+
+@app.route('/snapshot.jpg')
+def snapshot():
+    """Single JPEG of the most recent frame. Pass wait=1 to wait for the next
+    frame instead."""
+    wait = request.args.get('wait', default=0, type=int)
+    seq, timestamp, frame = latest_frame(wait)
+    return frame_response(seq, timestamp, lambda: frame[0], 'image/jpeg')
+
+@app.route('/zones')
+def zone_state():
+    """Occupancy of each configured zone for the latest frame."""
+    get_camera().get_latest()
+    return jsonify(zones.state())
+
+@app.route('/zones/events')
+def zone_event_stream():
+    """Zone enter/exit events as text/event-stream. Resumes after the
+    Last-Event-ID header or the `since` argument when given."""
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('since', default=zones.last_event, type=int)
+    return Response(zone_events(last_id), mimetype='text/event-stream')
+
+@app.route('/detector')
+def detector_stats():
+    """Per-stage counters and timings of the backend's person detector."""
+    return jsonify(Camera.detector.stats if Camera.detector else {})
+
+@app.route('/record')
+def record_status():
+    """Whether recording is on, with frame, drop and segment counters."""
+    return jsonify(recorder.status())
+
+@app.route('/record/start', methods=['POST'])
+def record_start():
+    get_camera()
+    recorder.start()
+    return jsonify(recorder.status())
+
+@app.route('/record/stop', methods=['POST'])
+def record_stop():
+    recorder.stop()
+    return jsonify(recorder.status())
 
 if __name__ == '__main__':
     app.run( host='0.0.0.0', port=8008, threaded=True)
@@ -16,7 +16,7 @@ class CameraEvent(object):
     def __init__(self):
         self.events = {}
 
-    def wait(self):
+    def wait(self, timeout=None):
         """Invoked from each client's thread to wait for the next frame."""
         ident = get_ident()
         if ident not in self.events:
@@ -24,7 +24,7 @@ class CameraEvent(object):
             # add an entry for it in the self.events dict
             # each entry has two elements, a threading.Event() and a timestamp
             self.events[ident] = [threading.Event(), time.time()]
-        return self.events[ident][0].wait()
+        return self.events[ident][0].wait(timeout)
 
     def set(self):
         """Invoked by the camera thread when a new frame is available."""
@@ -54,7 +54,10 @@ class CameraEvent(object):
 class BaseCamera(object):
     thread = None  # background thread that reads frames from camera
     frame = None  # current frame is stored here by background thread
+    latest = (0, 0, None)  # (sequence number, capture time, frame)
     last_access = 0  # time of last client access to the camera
+    detector = None  # person detector of the backend, if it has one
+    listeners = []  # called as listener(seq, timestamp, frame) for every frame
     event = CameraEvent()
 
     def __init__(self):
@@ -79,6 +82,30 @@ class BaseCamera(object):
 
         return BaseCamera.frame
 
+    def get_latest(self):
+        """Return the most recent frame without waiting, together with its
+        sequence number and capture time."""
+        BaseCamera.last_access = time.time()
+        return BaseCamera.latest
+
+    def get_newer(self, seq, timeout=None):
+        """Wait for a frame newer than `seq` and return it like get_latest().
+
+        If no newer frame arrives within `timeout` seconds the current frame
+        is returned instead.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while BaseCamera.latest[0] <= seq:
+            BaseCamera.last_access = time.time()
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+            BaseCamera.event.wait(remaining)
+            BaseCamera.event.clear()
+        return self.get_latest()
+
     @staticmethod
     def frames():
         """"Generator that returns frames from the camera."""
@@ -91,6 +118,13 @@ class BaseCamera(object):
         frames_iterator = cls.frames()
         for frame in frames_iterator:
             BaseCamera.frame = frame
+            BaseCamera.latest = (BaseCamera.latest[0] + 1, time.time(), frame)
+            for listener in BaseCamera.listeners:
+                try:
+                    listener(*BaseCamera.latest)
+                except Exception as e:
+                    # a broken listener must not stop the camera for everyone
+                    print(f'Camera listener {listener!r} failed: {e!r}')
             BaseCamera.event.set()  # send signal to clients
             time.sleep(0)
 
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""Compare per-frame allocations of the old capture path
+(VideoCapture.read() plus frame.copy()) with VideoCapture.read(dst) into a
+FramePool, reading a generated 1080p video.
+
+    python bench_frame_pool.py [frames]
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from frame_pool import ByteBuffer, FramePool
+
+SHAPE = (1080, 1920, 3)
+
+
+def rss_mib():
+    """Current resident set size in MiB."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_video(path, frames):
+    """Write a 1080p MJPEG file to read frames from."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, SHAPE[1::-1])
+    for i in range(frames):
+        writer.write(np.full(SHAPE, i % 256, np.uint8))
+    writer.release()
+
+
+def fresh(capture, n):
+    """The old path: a new array per read, then frame.copy() to draw on."""
+    for _ in range(n):
+        ret, frame = capture.read()
+        frame_copy = frame.copy()
+        frame_copy[0, 0] = 0
+
+
+def pooled(capture, pool, n):
+    """Read into a pooled buffer and draw on it in place."""
+    for _ in range(n):
+        buf = pool.acquire()
+        ret, frame = capture.read(buf.array)
+        assert frame is buf.array
+        frame[0, 0] = 0
+        buf.release()
+
+
+def jpeg_bytes(jpeg, stream, n):
+    """Encoder output written into a reused ByteBuffer; only the bytes
+    handed to clients are allocated."""
+    for _ in range(n):
+        for i in range(0, len(jpeg), 4096):
+            stream.write(jpeg[i:i + 4096])
+        bytes(stream.getbuffer())
+        stream.reset()
+
+
+def measure(name, fn, n, *args):
+    fn(*args, n=10)  # warm up so steady state is measured
+    rss = rss_mib()
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args, n=n)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:8s} {elapsed / n * 1000:7.2f} ms/frame  "
+          f"peak allocated {peak / 2**20:7.2f} MiB  "
+          f"rss {rss:7.1f} -> {rss_mib():7.1f} MiB")
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    path = os.path.join(tempfile.mkdtemp(), 'bench.avi')
+    make_video(path, n + 10)  # warm up plus measured frames
+    pool = FramePool(SHAPE)
+    measure('fresh', fresh, n, cv2.VideoCapture(path))
+    measure('pooled', pooled, n, cv2.VideoCapture(path), pool)
+    print(f"pool buffers allocated: {pool.allocated}")
+    jpeg = bytes(np.random.randint(0, 255, 300_000, np.uint8))
+    measure('jpeg', jpeg_bytes, n, jpeg, ByteBuffer())
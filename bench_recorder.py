@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""Measure capture FPS of a synthetic camera with recording off, on, and on
+with a simulated slow disk, to check that recording never slows capture.
+
+    python bench_recorder.py [seconds per run]
+"""
+import sys
+import tempfile
+import time
+import recorder
+from base_camera import BaseCamera
+
+TARGET_FPS = 100
+
+
+class SyntheticCamera(BaseCamera):
+    """Yields the sample JPEGs as fast as a TARGET_FPS camera would."""
+    imgs = [open(f + '.jpg', 'rb').read() for f in ['1', '2', '3']]
+
+    @staticmethod
+    def frames():
+        i = 0
+        while True:
+            i += 1
+            yield SyntheticCamera.imgs[i % 3], [{"id": i, "label": "person"}], ""
+            time.sleep(1 / TARGET_FPS)
+
+
+def measure(camera, seconds):
+    """Frames per second published by the camera thread."""
+    start_seq = camera.get_latest()[0]
+    start = time.time()
+    while time.time() - start < seconds:
+        time.sleep(0.1)
+        camera.get_latest()  # keep the camera thread alive
+    return (camera.get_latest()[0] - start_seq) / (time.time() - start)
+
+
+if __name__ == '__main__':
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 3
+    camera = SyntheticCamera()
+    rec = recorder.Recorder(tempfile.mkdtemp(), segment_seconds=1)
+    BaseCamera.listeners.append(rec.update)
+
+    print(f"recording off      {measure(camera, seconds):6.1f} fps")
+
+    rec.start()
+    print(f"recording on       {measure(camera, seconds):6.1f} fps  {rec.status()}")
+    rec.stop()
+
+    write = recorder.Segment.write
+
+    def slow_write(self, *args):
+        time.sleep(0.05)  # a disk that manages 20 frames per second
+        write(self, *args)
+    recorder.Segment.write = slow_write
+    rec.stats = dict.fromkeys(rec.stats, 0)
+    rec.start()
+    print(f"slow disk          {measure(camera, seconds):6.1f} fps  {rec.status()}")
+    rec.stop()
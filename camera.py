@@ -10,5 +10,5 @@ class Camera(BaseCamera):
     @staticmethod
     def frames():
         while True:
-            yield Camera.imgs[int(time.time()) % 3]
+            yield Camera.imgs[int(time.time()) % 3], [], ""
             time.sleep(1)
@@ -2,10 +2,11 @@ import cv2 as cv
 import threading
 # from imutils.video.pivideostream import PiVideoStream  #Only if using a pi camera. You also need to change some code in that case.
 from base_camera import BaseCamera
+from frame_pool import FramePool
+from detection import PersonCascade
 import time
 from datetime import datetime
 import numpy as np
-from base64 import b64encode
 from enum import Enum
 import uuid
 import os
@@ -22,8 +23,6 @@ class Camera(BaseCamera):
         self.camera_index = camera_index
         self.flip = flip # Flip frame vertically
         self.file_type = file_type # image type i.e. .jpg
-        self.model = cv.dnn.readNetFromTensorflow('models/frozen_inference_graph.pb',
-                                      'models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt')
         self.classNames = {0: 'background',
               1: 'person', 2: 'bicycle', 3: 'car', 4: 'motorcycle', 5: 'airplane', 6: 'bus',
               7: 'train', 8: 'truck', 9: 'boat', 10: 'traffic light', 11: 'fire hydrant',
@@ -68,26 +67,28 @@ class Camera(BaseCamera):
         """Retrieves a frame from the video source, processes it, and returns it as a JPEG-encoded byte string along with person detection status. """
         camera = Camera()
         camera.vs = cv.VideoCapture(camera.camera_index)
-        
+        Camera.detector = camera.detector = PersonCascade.from_env()
+        pool = None  # created once the frame size is known
+
         # ret, frame = self.flip_if_needed(self.vs.read())
         while True:
-            ret, frame = camera.vs.read()
+            buf = pool.acquire() if pool else None
+            ret, frame = camera.vs.read(buf.array if buf else None)
             if not ret:  # Check if frame was read successfully
                 print("Error reading frame, check camera connection")
                 return None # Or raise an exception if needed
-            image_height, image_width, _ = frame.shape
+            if pool is None:
+                pool = FramePool(frame.shape)
 
             cp_frame, person_detected, tracklets = camera.detect_and_draw_person(frame)
-            
+
             ret, jpeg = cv.imencode('.jpg', cp_frame)
+            if buf:
+                buf.release()
             if not ret:
                 print("Error encoding frame as JPEG")
                 return None 
-            frame_data = b64encode(jpeg).decode('utf-8')
-            
-            previous_frame = jpeg
-            objects = []
-            yield cv.imencode('.jpg', cp_frame)[1].tobytes(), tracklets, person_detected
+            yield jpeg.tobytes(), tracklets, person_detected
 
 
     def release(self):
@@ -99,25 +100,22 @@ class Camera(BaseCamera):
 
         Args:
             frame: The OpenCV image frame to process.
-            model: The pre-trained object detection model.
             id_class_name: A function to map class IDs to class names.
             confidence_threshold: The minimum confidence level for drawing bounding boxes.
 
         Returns:
             The OpenCV image frame with bounding boxes drawn around detected persons.
+            Drawing happens in place; the frame is a pooled capture buffer.
         """
         person_detected = False
-        frame_copy = frame.copy()  # Avoid modifying the original frame
         tracklets = []
-        frame_width = frame_copy.shape[1]
-        frame_height = frame_copy.shape[0]
+        frame_width = frame.shape[1]
+        frame_height = frame.shape[0]
         frame_center_x = frame_width // 2
 
         
 
-        blob = cv.dnn.blobFromImage(frame_copy, size=(150, 150), swapRB=True)
-        self.model.setInput(blob)
-        output = self.model.forward()
+        output = self.detector.detect(frame, confidence_threshold)
 
         for detection in output[0, 0, :, :]:
             confidence = detection[2]
@@ -129,10 +127,10 @@ class Camera(BaseCamera):
 
 
                                                 # Calculate bounding box coordinates
-                    x1 = int(detection[3] * frame_copy.shape[1])
-                    y1 = int(detection[4] * frame_copy.shape[0])
-                    x2 = int(detection[5] * frame_copy.shape[1])
-                    y2 = int(detection[6] * frame_copy.shape[0])
+                    x1 = int(detection[3] * frame.shape[1])
+                    y1 = int(detection[4] * frame.shape[0])
+                    x2 = int(detection[5] * frame.shape[1])
+                    y2 = int(detection[6] * frame.shape[0])
 
                     center_x = (x1 + x2) // 2
                     center_y = (y1 + y2) // 2
@@ -161,15 +159,15 @@ class Camera(BaseCamera):
 
 
                     # print(str(str(class_id) + " " + str(detection[2])  + " " + class_name))
-                    # box_x = detection[3] * frame_copy.shape[1]  # image_width
-                    # box_y = detection[4] * frame_copy.shape[0]  # image_height
-                    # box_width = detection[5] * frame_copy.shape[1]  
-                    # box_height = detection[6] * frame_copy.shape[0] 
-                    # cv.rectangle(frame_copy, (int(box_x), int(box_y)), (int(box_width), int(box_height)), (23, 230, 210), thickness=1)
-                    # cv.putText(frame_copy, class_name, (int(box_x), int(box_y + 0.05 * frame_copy.shape[0])), cv.FONT_HERSHEY_SIMPLEX, (0.005 * frame_copy.shape[1]), (0, 0, 255))
-                    cv.rectangle(frame_copy, (x1, y1), (x2, y2), (23, 230, 210), thickness=1)
-                    cv.circle(frame_copy, (center_x, center_y), 3, (0, 255, 0), -1)
-                    cv.putText(frame_copy, f"{class_name} {confidence:.2f}", (x1, y1 - 10), 
+                    # box_x = detection[3] * frame.shape[1]  # image_width
+                    # box_y = detection[4] * frame.shape[0]  # image_height
+                    # box_width = detection[5] * frame.shape[1]  
+                    # box_height = detection[6] * frame.shape[0] 
+                    # cv.rectangle(frame, (int(box_x), int(box_y)), (int(box_width), int(box_height)), (23, 230, 210), thickness=1)
+                    # cv.putText(frame, class_name, (int(box_x), int(box_y + 0.05 * frame.shape[0])), cv.FONT_HERSHEY_SIMPLEX, (0.005 * frame.shape[1]), (0, 0, 255))
+                    cv.rectangle(frame, (x1, y1), (x2, y2), (23, 230, 210), thickness=1)
+                    cv.circle(frame, (center_x, center_y), 3, (0, 255, 0), -1)
+                    cv.putText(frame, f"{class_name} {confidence:.2f}", (x1, y1 - 10), 
                     cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
 
-        return frame_copy, person_detected, tracklets
\ No newline at end of file
+        return frame, person_detected, tracklets
\ No newline at end of file
@@ -1,7 +1,7 @@
-import io
 import time
 import picamera
 from base_camera import BaseCamera
+from frame_pool import ByteBuffer
 
 
 class Camera(BaseCamera):
@@ -11,13 +11,11 @@ class Camera(BaseCamera):
             # let camera warm up
             time.sleep(2)
 
-            stream = io.BytesIO()
+            stream = ByteBuffer()
             for _ in camera.capture_continuous(stream, 'jpeg',
                                                  use_video_port=True):
                 # return current frame
-                stream.seek(0)
-                yield stream.read()
+                yield bytes(stream.getbuffer()), [], ""
 
-                # reset stream for next frame
-                stream.seek(0)
-                stream.truncate()
+                # reuse the buffer for the next frame
+                stream.reset()
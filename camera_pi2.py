@@ -1,7 +1,7 @@
-import io
 import time
 from picamera2 import Picamera2, Preview
 from base_camera import BaseCamera
+from frame_pool import ByteBuffer
 
 class Camera(BaseCamera):
     @staticmethod
@@ -12,15 +12,13 @@ class Camera(BaseCamera):
             # let camera warm up
             time.sleep(2) 
 
-            stream = io.BytesIO()
+            stream = ByteBuffer()
             try:
                 while True:
                     camera.capture_file(stream, format='jpeg')
-                    stream.seek(0)
-                    yield stream.read()
+                    yield bytes(stream.getbuffer()), [], ""
 
-                    # reset stream for next frame
-                    stream.seek(0)
-                    stream.truncate()
+                    # reuse the buffer for the next frame
+                    stream.reset()
             finally:
                 camera.stop()
@@ -1,8 +1,9 @@
-import io
-from PIL import Image
 import select
+import cv2
+import numpy as np
 import v4l2capture
 from base_camera import BaseCamera
+from frame_pool import FramePool
 
 
 class Camera(BaseCamera):
@@ -20,16 +21,19 @@ class Camera(BaseCamera):
         video.create_buffers(1)
         video.queue_all_buffers()
         video.start()
-        bio = io.BytesIO()
+        pool = FramePool((size_y, size_x, 3))
 
         try:
             while True:
                 select.select((video,), (), ())  # Wait for the device to fill the buffer.
                 image_data = video.read_and_queue()
-                image = Image.frombytes("RGB", (size_x, size_y), image_data)
-                image.save(bio, format="jpeg")
-                yield bio.getvalue()
-                bio.seek(0)
-                bio.truncate()
+                # view the captured RGB bytes as an image without copying them,
+                # and convert to BGR into a pooled buffer for the encoder
+                rgb = np.frombuffer(image_data, np.uint8).reshape(size_y, size_x, 3)
+                buf = pool.acquire()
+                cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR, dst=buf.array)
+                jpeg = cv2.imencode('.jpg', buf.array)[1].tobytes()
+                buf.release()
+                yield jpeg, [], ""
         finally:
             video.close()
@@ -1,6 +1,8 @@
 import os
 import cv2
 from base_camera import BaseCamera
+from frame_pool import FramePool
+from detection import PersonCascade
 
 
 class Camera(BaseCamera):
@@ -18,8 +20,7 @@ class Camera(BaseCamera):
     @staticmethod
     def frames():
         camera = cv2.VideoCapture(Camera.video_source)
-        model = cv2.dnn.readNetFromTensorflow('models/frozen_inference_graph.pb',
-                                      'models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt')
+        Camera.detector = detector = PersonCascade.from_env()
     
         classNames = {0: 'background',
               1: 'person', 2: 'bicycle', 3: 'car', 4: 'motorcycle', 5: 'airplane', 6: 'bus',
@@ -43,20 +44,21 @@ class Camera(BaseCamera):
         if not camera.isOpened():
             raise RuntimeError('Could not start camera.')
 
+        pool = None  # created once the frame size is known
         while True:
-            # read current frame
-            ret, frame = camera.read()
+            # read current frame, straight into a pooled buffer
+            buf = pool.acquire() if pool else None
+            ret, frame = camera.read(buf.array if buf else None)
 
             if not ret:  # Check if frame was read successfully
                 print("Error reading frame, check camera connection")
                 return None # Or raise an exception if needed
+            if pool is None:
+                pool = FramePool(frame.shape)
 
             person_detected = False
-            frame_copy = frame.copy()  # Avoid modifying the original frame
             objects = []
-            blob = cv2.dnn.blobFromImage(frame_copy, size=(150, 150), swapRB=True)
-            model.setInput(blob)
-            output = model.forward()
+            output = detector.detect(frame)
             debug_data = []
 
             for detection in output[0, 0, :, :]:
@@ -73,26 +75,26 @@ class Camera(BaseCamera):
                     if class_name == 'person':
                         person_detected = True
                         # print(str(str(class_id) + " " + str(detection[2])  + " " + class_name))
-                        box_x = detection[3] * frame_copy.shape[1]  # image_width
-                        box_y = detection[4] * frame_copy.shape[0]  # image_height
-                        box_width = detection[5] * frame_copy.shape[1]  
-                        box_height = detection[6] * frame_copy.shape[0] 
-                        cv2.rectangle(frame_copy, (int(box_x), int(box_y)), (int(box_width), int(box_height)), (23, 230, 210), thickness=1)
-                        cv2.putText(frame_copy, class_name, (int(box_x), int(box_y + 0.05 * frame_copy.shape[0])), cv2.FONT_HERSHEY_SIMPLEX, (0.005 * frame_copy.shape[1]), (0, 0, 255))
+                        box_x = detection[3] * frame.shape[1]  # image_width
+                        box_y = detection[4] * frame.shape[0]  # image_height
+                        box_width = detection[5] * frame.shape[1]  
+                        box_height = detection[6] * frame.shape[0] 
+                        cv2.rectangle(frame, (int(box_x), int(box_y)), (int(box_width), int(box_height)), (23, 230, 210), thickness=1)
+                        cv2.putText(frame, class_name, (int(box_x), int(box_y + 0.05 * frame.shape[0])), cv2.FONT_HERSHEY_SIMPLEX, (0.005 * frame.shape[1]), (0, 0, 255))
                         debug_data.append("box y:"+ str(box_y) )
                         debug_data.append("box x:"+ str(box_x) )
                         debug_data.append("box_width: "+str(box_width))
                         debug_data.append("height: "+str(box_height))
-                        debug_data.append("middle of image: "  +str(frame_copy.shape[1]//2))
+                        debug_data.append("middle of image: "  +str(frame.shape[1]//2))
                         objects.append({
                             "id": "0",
                             "label": "person",
                             "status": "FALSE",
                             "roi": {
-                                "x1": "0",
-                                "y1": "0",
-                                "x2": "0",
-                                "y2": "0"
+                                "x1": int(box_x),
+                                "y1": int(box_y),
+                                "x2": int(box_width),  # detection[5], the right edge
+                                "y2": int(box_height)  # detection[6], the bottom edge
                             },
                             "spatialCoordinates": {
                                 "x": str(box_x),
@@ -102,4 +104,7 @@ class Camera(BaseCamera):
                         })
 
             # encode as a jpeg image and return it
-            yield cv2.imencode('.jpg', frame_copy)[1].tobytes(), objects, debug_data
+            jpeg = cv2.imencode('.jpg', frame)[1].tobytes()
+            if buf:
+                buf.release()
+            yield jpeg, objects, debug_data
@@ -0,0 +1,132 @@
+import os
+import time
+import numpy as np
+from inference import (CONFIG_PATH, INPUT_SIZE, MODEL_PATH, confident_rows, engine_from_env,
+                       parse_variants)
+
+PERSON_CLASS_ID = 1
+NO_DETECTIONS = np.zeros((1, 1, 0, 7), np.float32)  # empty SSD output
+
+
+class PersonCascade(object):
+    """Two stage person detector.
+
+    A cheap gate (by default the same SSD at a much smaller input size) runs
+    on every frame. The full size SSD only runs when the gate sees a person
+    above `gate_threshold`, or every `validate_every` frames so gate misses
+    can be counted. detect() returns the raw SSD output either way, so
+    callers decode it exactly as they would decode model.forward().
+    Setting `gate_size` to 0 disables the gate.
+
+    Both stages are InferenceEngines loaded on the first frame. With
+    INFERENCE_AUTOTUNE, a stage runs with the default configuration until it
+    sees a frame with confident detections, and is tuned on that frame.
+    """
+    def __init__(self, full_size=INPUT_SIZE, gate_size=96, gate_threshold=0.3,
+                 validate_every=30, model=MODEL_PATH, config=CONFIG_PATH,
+                 variants=(), gate_model=None, gate_config=None):
+        self.full_size = full_size
+        self.gate_size = gate_size
+        self.gate_threshold = gate_threshold
+        self.validate_every = validate_every
+        self.model = model
+        self.config = config
+        self.variants = variants
+        self.gate_model = gate_model or model
+        self.gate_config = gate_config if gate_model else config
+        self.full = None
+        self.gate = None
+        self.stats = {
+            "frames": 0,
+            "gateFired": 0,
+            "fullRuns": 0,
+            "gateMisses": 0,
+            "gateMs": 0.0,
+            "fullMs": 0.0
+        }
+
+    @classmethod
+    def from_env(cls):
+        """Build a cascade configured by the CASCADE_* and INFERENCE_*
+        environment variables."""
+        env = os.environ
+        return cls(full_size=int(env.get('CASCADE_FULL_SIZE', INPUT_SIZE)),
+                   gate_size=int(env.get('CASCADE_GATE_SIZE', 96)),
+                   gate_threshold=float(env.get('CASCADE_GATE_THRESHOLD', 0.3)),
+                   validate_every=int(env.get('CASCADE_VALIDATE_EVERY', 30)),
+                   model=env.get('INFERENCE_MODEL', MODEL_PATH),
+                   config=env.get('INFERENCE_CONFIG', CONFIG_PATH) or None,
+                   variants=parse_variants(env.get('INFERENCE_VARIANTS')),
+                   gate_model=env.get('CASCADE_GATE_MODEL'),
+                   gate_config=env.get('CASCADE_GATE_CONFIG'))
+
+    def load(self, frame):
+        """Load both stages, using `frame` as the tuning sample."""
+        self.load_full(frame)
+        # a separate net even for the same model, switching input sizes on one
+        # net would reallocate its layers every frame
+        if self.gate_size:
+            self.load_gate(frame)
+
+    def load_full(self, frame):
+        # the full stage dominates, so it picks the process wide thread count
+        self.full = engine_from_env(frame, self.model, self.config, self.full_size,
+                                    self.variants, tune_threads=True)
+        self.update_engine_stats()
+
+    def load_gate(self, frame):
+        self.gate = engine_from_env(frame, self.gate_model, self.gate_config,
+                                    self.gate_size)
+        self.update_engine_stats()
+
+    def update_engine_stats(self):
+        self.stats["engines"] = {
+            "full": dict(self.full.options(), needsTuning=self.full.needs_tuning),
+            "gate": dict(self.gate.options(), needsTuning=self.gate.needs_tuning)
+                    if self.gate else None
+        }
+
+    def tune_pending(self, frame, gate_output, full_output):
+        """Tune stages still waiting for a frame with confident detections.
+        The gate waits for the full stage, which sets the thread count."""
+        if self.full.needs_tuning and len(confident_rows(full_output)):
+            self.load_full(frame)
+        if (self.gate is not None and self.gate.needs_tuning and not self.full.needs_tuning
+                and gate_output is not None and len(confident_rows(gate_output))):
+            self.load_gate(frame)
+
+    def run(self, engine, frame, stat):
+        """Run one stage and fold its time into a moving average in ms."""
+        start = time.perf_counter()
+        output = engine.forward(frame)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.stats[stat] += (elapsed - self.stats[stat]) * 0.1
+        return output
+
+    def detect(self, frame, confidence_threshold=0.7):
+        """Return SSD output for `frame`; `confidence_threshold` is only used
+        to decide whether a validation run caught a person the gate missed."""
+        if self.full is None:
+            self.load(frame)
+        self.stats["frames"] += 1
+        fired = True
+        gate_output = None
+        if self.gate is not None:
+            gate_output = self.run(self.gate, frame, "gateMs")
+            gate = gate_output[0, 0]
+            fired = bool(np.any((gate[:, 1] == PERSON_CLASS_ID)
+                                & (gate[:, 2] > self.gate_threshold)))
+            self.stats["gateFired"] += fired
+            validate = self.validate_every and self.stats["frames"] % self.validate_every == 0
+            if not (fired or validate):
+                return NO_DETECTIONS
+
+        output = self.run(self.full, frame, "fullMs")
+        self.stats["fullRuns"] += 1
+        if not fired:
+            found = output[0, 0]
+            self.stats["gateMisses"] += bool(np.any((found[:, 1] == PERSON_CLASS_ID)
+                                                    & (found[:, 2] > confidence_threshold)))
+        if self.full.needs_tuning or (self.gate is not None and self.gate.needs_tuning):
+            self.tune_pending(frame, gate_output, output)
+        return output
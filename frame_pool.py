@@ -0,0 +1,68 @@
+import threading
+import numpy as np
+
+
+class FrameBuffer(object):
+    """One preallocated buffer of a FramePool; release() hands it back."""
+    def __init__(self, pool, array):
+        self.pool = pool
+        self.array = array
+
+    def release(self):
+        with self.pool.lock:
+            self.pool.free.append(self)
+
+
+class FramePool(object):
+    """Preallocated frame buffers that capture code reads into.
+
+    The capture loops release their buffer before yielding, so one buffer is
+    enough; raise `count` for consumers that hold frames across cycles. When
+    every buffer is in use a new one is allocated rather than blocking the
+    capture loop, and `allocated` counts those so the pool size can be tuned.
+    """
+    def __init__(self, shape, dtype=np.uint8, count=1):
+        self.shape = tuple(shape)
+        self.dtype = dtype
+        self.lock = threading.Lock()
+        self.free = [FrameBuffer(self, np.empty(self.shape, dtype))
+                     for _ in range(count)]
+        self.allocated = count
+
+    def acquire(self):
+        with self.lock:
+            if self.free:
+                return self.free.pop()
+            self.allocated += 1
+        return FrameBuffer(self, np.empty(self.shape, self.dtype))
+
+
+class ByteBuffer(object):
+    """A growable, reusable byte buffer for encoders that write() their output.
+
+    It replaces the io.BytesIO seek/read/truncate cycle: reset() only rewinds,
+    so once the buffer has grown to the largest frame size no further memory
+    is allocated, and getbuffer() exposes the data without copying it.
+    """
+    def __init__(self, size=1 << 20):
+        self.data = bytearray(size)
+        self.length = 0
+
+    def write(self, b):
+        n = len(b)
+        end = self.length + n
+        if end > len(self.data):
+            self.data.extend(bytes(max(end - len(self.data), len(self.data))))
+        self.data[self.length:end] = b
+        self.length = end
+        return n
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        self.length = 0
+
+    def getbuffer(self):
+        """Return a memoryview of the bytes written since the last reset()."""
+        return memoryview(self.data)[:self.length]
@@ -0,0 +1,234 @@
+import json
+import os
+import platform
+import time
+import cv2 as cv
+import numpy as np
+
+MODEL_PATH = 'models/frozen_inference_graph.pb'
+CONFIG_PATH = 'models/ssd_mobilenet_v2_coco_2018_03_29.pbtxt'
+INPUT_SIZE = 150
+CACHE_PATH = 'models/inference_tuning.json'
+
+# names of the cv.dnn DNN_BACKEND_* / DNN_TARGET_* constants considered when
+# tuning; the ones missing from the installed OpenCV build are skipped
+BACKENDS = ('OPENCV', 'INFERENCE_ENGINE', 'VKCOM', 'CUDA')
+TARGETS = ('CPU', 'OPENCL', 'OPENCL_FP16', 'MYRIAD', 'VULKAN', 'CUDA', 'CUDA_FP16')
+
+
+def backend_id(name):
+    return getattr(cv.dnn, 'DNN_BACKEND_' + name)
+
+
+def target_id(name):
+    return getattr(cv.dnn, 'DNN_TARGET_' + name)
+
+
+class InferenceEngine(object):
+    """A cv.dnn network with its input size, backend and target.
+
+    Any format cv.dnn.readNet understands can be loaded (TensorFlow .pb,
+    ONNX, OpenVINO IR, ...), including FP16/INT8 exports of the same model,
+    as long as it produces SSD DetectionOutput rows
+    [image, class, confidence, x1, y1, x2, y2].
+
+    The OpenCV thread count is process wide, so it is not part of an engine;
+    it is set once at load, see engine_from_env().
+
+    `needs_tuning` is set on the default engine autotune() returns when its
+    sample had nothing to validate against; callers retry with a later frame.
+    """
+    def __init__(self, model=MODEL_PATH, config=CONFIG_PATH, size=INPUT_SIZE,
+                 backend='DEFAULT', target='CPU'):
+        self.model = model
+        self.config = config
+        self.size = size
+        self.backend = backend
+        self.target = target
+        self.needs_tuning = False
+        self.net = cv.dnn.readNet(model, config or '')
+        self.net.setPreferableBackend(backend_id(backend))
+        self.net.setPreferableTarget(target_id(target))
+
+    def options(self):
+        """Keyword arguments that recreate this engine."""
+        return {
+            "model": self.model,
+            "config": self.config,
+            "size": self.size,
+            "backend": self.backend,
+            "target": self.target
+        }
+
+    def forward(self, frame):
+        self.net.setInput(cv.dnn.blobFromImage(frame, size=(self.size, self.size), swapRB=True))
+        return self.net.forward()
+
+
+def candidate_threads(max_threads=None):
+    """A few OpenCV thread counts worth trying on this host."""
+    max_threads = max_threads or os.cpu_count() or 1
+    return sorted({1, max(max_threads // 2, 1), max_threads})
+
+
+def candidate_options(variants, size):
+    """Yield engine options for every available backend/target pair and
+    model variant."""
+    for backend in BACKENDS:
+        if not hasattr(cv.dnn, 'DNN_BACKEND_' + backend):
+            continue
+        try:
+            available = list(cv.dnn.getAvailableTargets(backend_id(backend)))
+        except cv.error:
+            continue
+        for target in TARGETS:
+            if not hasattr(cv.dnn, 'DNN_TARGET_' + target) or target_id(target) not in available:
+                continue
+            for model, config in variants:
+                yield {"model": model, "config": config, "size": size,
+                       "backend": backend, "target": target}
+
+
+def confident_rows(output, threshold=0.3):
+    """Detections above `threshold`, in a stable order for comparison."""
+    rows = output.reshape(-1, 7)
+    rows = rows[rows[:, 2] > threshold]
+    return rows[np.lexsort((rows[:, 2], rows[:, 1]))]
+
+
+def outputs_match(output, reference, tolerance):
+    """Whether two SSD outputs agree on their confident detections to within
+    `tolerance` in confidence and normalized box coordinates. The reference
+    must have at least one confident detection, see autotune()."""
+    a = confident_rows(output)
+    b = confident_rows(reference)
+    if a.shape != b.shape:
+        return False
+    return float(np.abs(a - b).max()) <= tolerance
+
+
+def cpu_model():
+    """Name of the host CPU; platform.processor() is empty on Linux."""
+    try:
+        with open('/proc/cpuinfo') as f:
+            for line in f:
+                if line.startswith(('model name', 'Model', 'Hardware')):
+                    return line.split(':', 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def cache_key(model, config, size, variants, threads):
+    """Identify a tuning run by model files, thread counts, OpenCV build and
+    host CPU."""
+    files = [model] + [path for variant in variants for path in variant if path]
+    stamps = [f"{path}@{os.path.getmtime(path):.0f}" for path in files if os.path.exists(path)]
+    return "|".join([model, config or '', str(size), str(threads), cv.__version__,
+                     platform.machine(), cpu_model(), str(os.cpu_count())] + stamps)
+
+
+def autotune(sample, model=MODEL_PATH, config=CONFIG_PATH, size=INPUT_SIZE,
+             variants=(), tolerance=0.05, runs=10, cache_path=CACHE_PATH,
+             threads=None):
+    """Benchmark every candidate configuration on `sample` and return an
+    engine using the fastest one whose output matches the default engine's.
+
+    With `threads`, a list of OpenCV thread counts, each candidate is also
+    timed at every count and the fastest count is applied process wide;
+    otherwise the current count is kept. The choice is cached in
+    `cache_path` so later startups on the same host skip the benchmark.
+
+    A sample on which the default engine detects nothing cannot tell a
+    broken candidate from a good one, so the default engine is returned
+    with `needs_tuning` set and nothing is cached.
+
+    An unreadable cache is ignored and an unwritable one only logged, since
+    this runs in the camera thread.
+    """
+    threads = list(threads or [cv.getNumThreads()])
+    key = cache_key(model, config, size, variants, threads)
+    cache = {}
+    try:
+        if os.path.exists(cache_path):
+            with open(cache_path) as f:
+                cache = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f'Inference cache {cache_path} unreadable, tuning again: {e!r}')
+        cache = {}
+    if key in cache:
+        cv.setNumThreads(cache[key]["threads"])
+        return InferenceEngine(**cache[key]["options"])
+
+    original_threads = cv.getNumThreads()
+    reference_engine = InferenceEngine(model, config, size)
+    reference = reference_engine.forward(sample)
+    if not len(confident_rows(reference)):
+        reference_engine.needs_tuning = True
+        return reference_engine
+
+    best = None
+    for options in candidate_options([(model, config)] + list(variants), size):
+        try:
+            engine = InferenceEngine(**options)
+            for count in threads:
+                cv.setNumThreads(count)
+                # the first run doubles as warm up and accuracy check
+                if not outputs_match(engine.forward(sample), reference, tolerance):
+                    break
+                start = time.perf_counter()
+                for _ in range(runs):
+                    engine.forward(sample)
+                elapsed = (time.perf_counter() - start) / runs
+                print(f"Inference candidate {options} threads={count}: {elapsed * 1000:.2f} ms")
+                if best is None or elapsed < best[0]:
+                    best = (elapsed, engine, count)
+        except cv.error:
+            continue  # advertised but not usable on this host
+
+    if best is None:
+        cv.setNumThreads(original_threads)
+        return reference_engine
+    elapsed, engine, count = best
+    cv.setNumThreads(count)
+    cache[key] = {"options": engine.options(), "threads": count, "ms": elapsed * 1000}
+    try:
+        with open(cache_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        print(f'Inference cache {cache_path} not written: {e!r}')
+    return engine
+
+
+def parse_variants(value):
+    """Parse a comma separated list of `model` or `model|config` paths."""
+    variants = []
+    for item in filter(None, (value or '').split(',')):
+        model, _, config = item.partition('|')
+        variants.append((model.strip(), config.strip() or None))
+    return variants
+
+
+def engine_from_env(sample, model=MODEL_PATH, config=CONFIG_PATH, size=INPUT_SIZE,
+                    variants=(), tune_threads=False):
+    """Load an engine configured by the INFERENCE_* environment variables,
+    tuning it on `sample` when INFERENCE_AUTOTUNE is set.
+
+    The process wide thread count is set here, once: from INFERENCE_THREADS,
+    or by tuning when `tune_threads` is true. Pass it for one engine only
+    and load the others after it so they are tuned at that count.
+    """
+    env = os.environ
+    threads = int(env.get('INFERENCE_THREADS', 0))
+    if env.get('INFERENCE_AUTOTUNE', '0') not in ('', '0'):
+        if threads:
+            cv.setNumThreads(threads)
+        return autotune(sample, model, config, size, variants,
+                        tolerance=float(env.get('INFERENCE_TOLERANCE', 0.05)),
+                        cache_path=env.get('INFERENCE_CACHE', CACHE_PATH),
+                        threads=candidate_threads() if tune_threads and not threads else None)
+    if threads:
+        cv.setNumThreads(threads)
+    return InferenceEngine(model, config, size,
+                           backend=env.get('INFERENCE_BACKEND', 'DEFAULT'),
+                           target=env.get('INFERENCE_TARGET', 'CPU'))
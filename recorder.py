@@ -0,0 +1,197 @@
+import json
+import os
+import queue
+import threading
+import time
+
+FILE_PREFIX = 'rec-'
+VIDEO_FORMATS = ('mjpeg', 'avi')
+
+
+class Segment(object):
+    """One time slice of a recording: a video file plus a line-delimited JSON
+    sidecar with the detections of every frame written to it."""
+    def __init__(self, directory, start, seq, video_format='mjpeg', fps=10):
+        self.start = start
+        self.video_format = video_format
+        self.fps = fps
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(start))
+        name = os.path.join(directory, f'{FILE_PREFIX}{stamp}-{seq}')
+        self.sidecar = open(name + '.jsonl', 'w')
+        self.writer = None
+        if video_format == 'mjpeg':
+            # the camera already hands out JPEGs, so this needs no re-encoding
+            self.video = open(name + '.mjpeg', 'wb')
+        else:
+            self.video = None
+            self.video_path = name + '.' + video_format
+
+    def write(self, seq, timestamp, jpeg, objects):
+        if self.video is not None:
+            self.video.write(jpeg)
+        else:
+            self.write_frame(jpeg)
+        self.sidecar.write(json.dumps({"seq": seq, "timestamp": timestamp, "objects": objects},
+                                      default=str) + '\n')
+
+    def write_frame(self, jpeg):
+        """Decode a JPEG and append it through cv2.VideoWriter."""
+        import cv2
+        import numpy as np
+        image = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError('Could not decode frame')
+        if self.writer is None:
+            height, width = image.shape[:2]
+            self.writer = cv2.VideoWriter(self.video_path, cv2.VideoWriter_fourcc(*'MJPG'),
+                                          self.fps, (width, height))
+        if not self.writer.isOpened():
+            raise OSError(f'Could not open video writer for {self.video_path}')
+        self.writer.write(image)
+
+    def close(self):
+        if self.video is not None:
+            self.video.close()
+        if self.writer is not None:
+            self.writer.release()
+        self.sidecar.close()
+
+
+class Recorder(object):
+    """Records the annotated stream and its detections to rotating segments.
+
+    update() is registered as a camera listener and only queues the frame, so
+    the camera thread never waits on the disk. A separate writer thread drains
+    the bounded queue; when it falls behind, new frames are dropped and
+    counted instead of blocking capture. After each segment, the oldest
+    recordings are deleted until the directory is within `max_bytes` and
+    `max_age` seconds.
+    """
+    def __init__(self, directory='recordings', segment_seconds=60, video_format='mjpeg',
+                 fps=10, queue_size=64, max_bytes=2 * 1024 ** 3, max_age=7 * 24 * 3600):
+        if video_format not in VIDEO_FORMATS:
+            raise ValueError(f'Unsupported recording format {video_format!r}, '
+                             f'use one of {", ".join(VIDEO_FORMATS)}')
+        self.directory = directory
+        self.segment_seconds = segment_seconds
+        self.video_format = video_format
+        self.fps = fps
+        self.queue_size = queue_size
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.queue = queue.Queue(queue_size)
+        self.recording = False
+        self.thread = None
+        self.stats = {"frames": 0, "dropped": 0, "segments": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls):
+        """Build a recorder configured by the RECORD_* environment variables."""
+        env = os.environ
+        return cls(directory=env.get('RECORD_DIR', 'recordings'),
+                   segment_seconds=float(env.get('RECORD_SEGMENT_SECONDS', 60)),
+                   video_format=env.get('RECORD_FORMAT', 'mjpeg'),
+                   fps=float(env.get('RECORD_FPS', 10)),
+                   queue_size=int(env.get('RECORD_QUEUE_SIZE', 64)),
+                   max_bytes=int(env.get('RECORD_MAX_BYTES', 2 * 1024 ** 3)),
+                   max_age=float(env.get('RECORD_MAX_AGE', 7 * 24 * 3600)))
+
+    def start(self):
+        if self.recording:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.queue = queue.Queue(self.queue_size)  # forget frames of a previous run
+        self.recording = True
+        # the writer gets its own queue so a late writer from a previous run
+        # can never consume this run's frames
+        self.thread = threading.Thread(target=self._thread, args=(self.queue,), daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        if not self.recording:
+            return
+        self.recording = False
+        try:
+            self.queue.put(None, timeout=1)  # tell the writer to finish its segment
+        except queue.Full:
+            # the writer is stuck or gone, drop what it has not written
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(None)
+        self.thread.join(timeout)
+        self.thread = None
+
+    def update(self, seq, timestamp, frame):
+        if not self.recording:
+            return
+        try:
+            self.queue.put_nowait((seq, timestamp, frame[0], frame[1]))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def status(self):
+        """Counters plus whether recording is on and the writer is running;
+        `writing` false while `recording` is true means the writer died."""
+        writing = self.thread is not None and self.thread.is_alive()
+        return dict(self.stats, recording=self.recording, writing=writing,
+                    queued=self.queue.qsize())
+
+    def _thread(self, frames):
+        """Writer thread."""
+        segment = None
+        try:
+            while True:
+                item = frames.get()
+                if item is None:
+                    break
+                seq, timestamp, jpeg, objects = item
+                try:
+                    if segment is None or timestamp - segment.start >= self.segment_seconds:
+                        if segment is not None:
+                            segment.close()
+                            self.enforce_retention()
+                        segment = Segment(self.directory, timestamp, seq,
+                                          self.video_format, self.fps)
+                        self.stats["segments"] += 1
+                    segment.write(seq, timestamp, jpeg, objects)
+                    self.stats["frames"] += 1
+                except Exception as e:
+                    # e.g. a full disk or a corrupt frame; skip the frame and
+                    # keep going, retention may free space
+                    print(f'Recording error: {e!r}')
+                    self.stats["errors"] += 1
+        finally:
+            if segment is not None:
+                try:
+                    segment.close()
+                    self.enforce_retention()
+                except Exception as e:
+                    print(f'Recording error: {e!r}')
+                    self.stats["errors"] += 1
+
+    def enforce_retention(self):
+        """Delete the oldest recordings beyond the size and age limits.
+
+        A segment's video and sidecar are deleted together so the audit
+        trail never keeps one without the other.
+        """
+        segments = {}
+        for name in os.listdir(self.directory):
+            if name.startswith(FILE_PREFIX):
+                path = os.path.join(self.directory, name)
+                stat = os.stat(path)
+                segment = segments.setdefault(os.path.splitext(path)[0], [0, 0, []])
+                segment[0] = max(segment[0], stat.st_mtime)
+                segment[1] += stat.st_size
+                segment[2].append(path)
+        total = sum(size for _, size, _ in segments.values())
+        now = time.time()
+        for mtime, size, paths in sorted(segments.values()):
+            if total <= self.max_bytes and now - mtime <= self.max_age:
+                break
+            for path in paths:
+                os.remove(path)
+            total -= size
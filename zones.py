@@ -0,0 +1,151 @@
+import json
+import os
+import threading
+from collections import deque
+import numpy as np
+
+INACTIVE_STATUSES = ('LOST', 'REMOVED')  # tracklets no longer in view
+
+
+def points_in_polygon(points, polygon):
+    """Even-odd test of all (N, 2) points against all polygon edges at once."""
+    x = points[:, 0:1]
+    y = points[:, 1:2]
+    x1, y1 = polygon[:, 0], polygon[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    crosses = (y1 > y) != (y2 > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        xi = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return np.count_nonzero(crosses & (x < xi), axis=1) % 2 == 1
+
+
+def points_in_box(points, lower, upper):
+    """Test all (N, 3) points against an axis aligned box."""
+    return np.all((points >= lower) & (points <= upper), axis=1)
+
+
+class Zone(object):
+    """A named area: either a polygon in image pixels, tested against the
+    centre of each tracklet's roi, or a box in millimetres, tested against its
+    spatialCoordinates."""
+    def __init__(self, name, polygon=None, box=None):
+        if (polygon is None) == (box is None):
+            raise ValueError(f'Zone {name!r} needs exactly one of polygon or box')
+        self.name = name
+        self.polygon = None
+        self.box = None
+        if polygon is not None:
+            self.polygon = np.asarray(polygon, dtype=float)
+            if self.polygon.ndim != 2 or self.polygon.shape[1] != 2 or len(self.polygon) < 3:
+                raise ValueError(f'Zone {name!r} polygon needs at least 3 [x, y] points')
+        else:
+            self.box = (np.asarray(box['min'], dtype=float),
+                        np.asarray(box['max'], dtype=float))
+            if self.box[0].shape != (3,) or self.box[1].shape != (3,):
+                raise ValueError(f'Zone {name!r} box needs [x, y, z] min and max')
+
+    def contains(self, centres, spatial):
+        """Return a boolean mask of the tracklets inside this zone."""
+        if self.polygon is not None:
+            return points_in_polygon(centres, self.polygon)
+        return points_in_box(spatial, *self.box)
+
+
+class ZoneEngine(object):
+    """Evaluates every zone against the tracklets of each frame and keeps the
+    occupancy of each zone plus a short history of enter/exit events.
+
+    update() is registered as a camera listener, so it runs once per frame in
+    the camera thread no matter how many clients are polling.
+
+    Only the DepthAI backend (camera_opencv) reports real millimetres in
+    spatialCoordinates, so box zones need it; on the other backends they
+    compare meaningless values. Polygon zones use the roi, which every
+    backend with a detector reports in pixels. Events follow tracker ids and
+    are only meaningful with camera_opencv; webcam and pedro number
+    detections per frame.
+    """
+    def __init__(self, zones, history=256):
+        self.zones = zones
+        self.condition = threading.Condition()
+        self.inside = {zone.name: set() for zone in zones}
+        self.counts = {zone.name: 0 for zone in zones}
+        self.events = deque(maxlen=history)
+        self.last_event = 0
+        self.seq = 0
+        self.timestamp = 0
+
+    @classmethod
+    def from_file(cls, path):
+        """Load zones from a JSON list; a missing file means no zones."""
+        if not os.path.exists(path):
+            return cls([])
+        with open(path) as f:
+            return cls([Zone(**zone) for zone in json.load(f)])
+
+    def update(self, seq, timestamp, frame):
+        objects = [t for t in frame[1]
+                   if str(t.get('status', '')).upper() not in INACTIVE_STATUSES]
+        ids = [str(t['id']) for t in objects]
+        inside = {}
+        counts = {}
+        if objects:
+            roi = np.array([[t['roi']['x1'], t['roi']['y1'], t['roi']['x2'], t['roi']['y2']]
+                            for t in objects], dtype=float)
+            centres = (roi[:, :2] + roi[:, 2:]) / 2
+            spatial = np.array([[t['spatialCoordinates']['x'],
+                                 t['spatialCoordinates']['y'],
+                                 t['spatialCoordinates']['z']]
+                                for t in objects], dtype=float)
+            for zone in self.zones:
+                mask = zone.contains(centres, spatial)
+                # backends without a tracker may repeat ids, so count the mask
+                counts[zone.name] = int(np.count_nonzero(mask))
+                inside[zone.name] = {ids[i] for i in np.flatnonzero(mask)}
+        else:
+            inside = {zone.name: set() for zone in self.zones}
+            counts = {zone.name: 0 for zone in self.zones}
+
+        with self.condition:
+            for name, now in inside.items():
+                before = self.inside[name]
+                for kind, changed in (('exit', before - now), ('enter', now - before)):
+                    for tracklet_id in sorted(changed):
+                        self.last_event += 1
+                        self.events.append({
+                            "id": self.last_event,
+                            "seq": seq,
+                            "timestamp": timestamp,
+                            "zone": name,
+                            "trackletId": tracklet_id,
+                            "type": kind
+                        })
+            self.inside = inside
+            self.counts = counts
+            self.seq = seq
+            self.timestamp = timestamp
+            self.condition.notify_all()
+
+    def state(self):
+        """Counts and tracklet ids per zone for the last evaluated frame."""
+        with self.condition:
+            return {
+                "seq": self.seq,
+                "timestamp": self.timestamp,
+                "lastEventId": self.last_event,
+                "zones": {name: {"count": self.counts[name], "ids": sorted(ids)}
+                          for name, ids in self.inside.items()}
+            }
+
+    def events_since(self, last_id, timeout=None):
+        """Return the events after `last_id`, waiting up to `timeout` seconds
+        for one if there are none yet.
+
+        An id beyond the last event comes from before a server restart, so
+        the client gets every event still retained instead.
+        """
+        with self.condition:
+            if last_id > self.last_event:
+                last_id = 0
+            self.condition.wait_for(lambda: self.last_event > last_id, timeout)
+            return [event for event in self.events if event['id'] > last_id]